@@ -7,10 +7,101 @@ VERSION: 3.0 - INTERACTIVE WORKFLOW WITH POLARS
 
 import streamlit as st
 import polars as pl
-import pandas as pd
 import logging
-import json
-from io import BytesIO, StringIO
+import atexit
+import queue
+import codecs
+import hashlib
+import os
+import statistics
+import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+from io import BytesIO
+from logging.handlers import QueueHandler, QueueListener
+
+# Optional Rust-based Excel reader (calamine, via fastexcel) for fast .xlsx ingest
+try:
+    import fastexcel  # noqa: F401
+    CALAMINE_AVAILABLE = True
+except ImportError:
+    CALAMINE_AVAILABLE = False
+
+# Streaming openpyxl reader without external links (Polars already sets data_only=True)
+OPENPYXL_READ_OPTIONS = {'read_only': True, 'keep_links': False}
+
+# Rows sampled when inferring column types of Excel sheets
+EXCEL_INFER_SCHEMA_LENGTH = 1000
+
+# Number of leading bytes sampled when sniffing text files
+SNIFF_BYTES = 65536
+
+# Candidate separators for TXT files, in order of preference on ties
+TXT_SEPARATORS = [',', '\t', ';', '|']
+
+# Rows per Parquet row group (~500k rows suits DuckDB/Trino-style readers)
+PARQUET_ROW_GROUP_SIZE = 512_000
+
+# Target uncompressed size of a Parquet data page (1 MiB)
+PARQUET_DATA_PAGE_SIZE = 1024 * 1024
+
+# Export formats: option -> (download label, file name, MIME type)
+EXPORT_FORMATS = {
+    'Parquet (.parquet)': ("📥 Download Parquet File", "Data_Merger_V3_Export.parquet", "application/octet-stream"),
+    'JSON (.json)': ("📥 Download JSON File", "Data_Merger_V3_Export.json", "application/json"),
+    'Excel (.xlsx)': (
+        "📥 Download Excel File",
+        "Data_Merger_V3_Export.xlsx",
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    ),
+}
+
+# Download info for JSON exports too large for a single JSON document
+NDJSON_EXPORT = ("📥 Download JSON Lines File", "Data_Merger_V3_Export.ndjson", "application/x-ndjson")
+
+# In-memory size above which JSON is exported as newline-delimited JSON
+NDJSON_THRESHOLD_BYTES = 100 * 1024 * 1024
+
+# Excel number formats for temporal columns, by Polars dtype
+EXCEL_TEMPORAL_FORMATS = {
+    pl.Date: 'yyyy-mm-dd',
+    pl.Datetime: 'yyyy-mm-dd hh:mm:ss',
+    pl.Time: 'hh:mm:ss',
+}
+
+# Maximum rows per Excel worksheet, including the header row
+EXCEL_MAX_ROWS = 1_048_576
+
+# Seconds to wait for exports before leaving them to finish in the background
+EXPORT_WAIT_SECONDS = 2
+
+# Optional S3 bucket for large exports, served through presigned URLs (requires boto3)
+EXPORT_S3_BUCKET = os.getenv('EXPORT_S3_BUCKET')
+
+# Encoded size above which exports are uploaded to EXPORT_S3_BUCKET instead of downloaded in-app
+EXPORT_S3_THRESHOLD_BYTES = 100 * 1024 * 1024
+
+# Lifetime of presigned export download links
+EXPORT_URL_EXPIRY_SECONDS = 3600
+
+# Seconds a cached presigned link is reused; at least ten minutes of validity remain when it is shown
+EXPORT_URL_REUSE_SECONDS = EXPORT_URL_EXPIRY_SECONDS - 600
+
+# Largest estimated export size accepted, in bytes (default 2 GiB)
+EXPORT_MAX_BYTES = int(os.getenv('EXPORT_MAX_BYTES', 2 * 1024**3))
+
+# Rough encoded size of each export format relative to the in-memory Arrow size
+EXPORT_SIZE_MULTIPLIERS = {
+    'Parquet (.parquet)': 0.3,
+    'JSON (.json)': 3.0,
+    'Excel (.xlsx)': 2.0,
+}
+
+# Operators offered by the Step 2 filter builder
+FILTER_OPERATORS = ['equals', 'not equals', 'contains', 'greater than', 'less than']
+
+# Delimited text formats, parsed from a temporary file on disk
+TEXT_FORMATS = ('csv', 'tsv', 'txt')
 
 # Set page config first to avoid conflicts
 st.set_page_config(
@@ -20,9 +111,14 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Configure logging
+# Configure logging once per process; reruns reuse the same queue listener
+@st.cache_resource
 def setup_logging():
-    """Configure logging for cloud deployment with fallback."""
+    """Configure logging for cloud deployment with fallback.
+
+    Records are put on a queue and written by a background listener thread,
+    so file or remote handlers never block the script run.
+    """
     try:
         # Try to create file handler, fallback to console only if it fails
         handlers = [logging.StreamHandler()]
@@ -32,10 +128,22 @@ def setup_logging():
             # File logging might not be available in cloud environments
             pass
 
+        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        log_queue = queue.SimpleQueue()
+        listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        listener.start()
+        atexit.register(listener.stop)
+
+        # Records are formatted by the listener's handlers, not on the queue side
+        queue_handler = QueueHandler(log_queue)
+        queue_handler.setFormatter(logging.Formatter('%(message)s'))
+
         logging.basicConfig(
             level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=handlers,
+            handlers=[queue_handler],
             force=True  # Override any existing configuration
         )
         return logging.getLogger(__name__)
@@ -46,9 +154,8 @@ def setup_logging():
 # Initialize logger
 logger = setup_logging()
 
-def apply_custom_css():
-    """Apply custom CSS for modern, professional styling."""
-    st.markdown("""
+# Custom CSS for modern, professional styling
+CUSTOM_CSS = """
     <style>
     /* Main app styling */
     .main {
@@ -191,7 +298,16 @@ def apply_custom_css():
         border-left: 4px solid #667eea;
     }
     </style>
-    """, unsafe_allow_html=True)
+    """
+
+@st.cache_resource
+def apply_custom_css():
+    """
+    Apply custom CSS for modern, professional styling.
+    Cached so the function body runs once; Streamlit replays the cached
+    markdown element on later reruns instead of rebuilding it.
+    """
+    st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
 
 def detect_file_format(file):
     """Detect file format based on file extension."""
@@ -202,8 +318,10 @@ def detect_file_format(file):
 
     if filename.endswith('.csv'):
         return 'csv'
-    elif filename.endswith(('.xlsx', '.xls')):
-        return 'excel'
+    elif filename.endswith('.xlsx'):
+        return 'xlsx'
+    elif filename.endswith('.xls'):
+        return 'xls'
     elif filename.endswith('.tsv'):
         return 'tsv'
     elif filename.endswith('.txt'):
@@ -211,7 +329,42 @@ def detect_file_format(file):
     else:
         return 'unknown'
 
-def read_file_with_polars(file, file_format):
+def detect_encoding(sample):
+    """
+    Detect the encoding of a text file from a sample of its leading bytes.
+
+    UTF-8 (and plain ASCII) data is decoded lossily by Polars in a single pass;
+    anything else falls back to Latin-1, which can decode any byte sequence.
+    """
+    try:
+        # Incremental decode tolerates a multi-byte character cut off at the sample boundary;
+        # a sample shorter than SNIFF_BYTES is the whole file, so trailing bytes must decode
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=len(sample) < SNIFF_BYTES)
+        return 'utf8-lossy'
+    except UnicodeDecodeError:
+        return 'latin-1'
+
+def detect_separator(sample):
+    """
+    Detect the separator of a delimited text file from a sample of its leading bytes.
+
+    Each candidate is scored by its median count per line, so a separator must
+    appear on most lines to win. Returns None if no candidate qualifies.
+    """
+    lines = [line for line in sample.split(b'\n') if line.strip()]
+    if len(sample) >= SNIFF_BYTES and len(lines) > 1:
+        lines = lines[:-1]  # Last line may be cut off by the sample boundary
+    if not lines:
+        return None
+
+    best_sep, best_score = None, 0
+    for sep in TXT_SEPARATORS:
+        score = statistics.median(line.count(sep.encode()) for line in lines)
+        if score > best_score:
+            best_sep, best_score = sep, score
+    return best_sep
+
+def read_file_with_polars(file, file_format, path=None):
     """
     Read file with Polars for superior performance.
     Enhanced error handling for all file formats.
@@ -219,6 +372,8 @@ def read_file_with_polars(file, file_format):
     Args:
         file: Uploaded file object
         file_format: Detected file format
+        path: Optional on-disk copy of the file; delimited text is parsed from it
+            so Polars can memory-map the data and parse it on all cores
 
     Returns:
         polars.DataFrame: Loaded data
@@ -226,90 +381,64 @@ def read_file_with_polars(file, file_format):
     try:
         file.seek(0)  # Always reset file pointer
 
-        if file_format == 'excel':
-            # For Excel files, use multiple approaches
-            try:
-                # First try with openpyxl engine
-                df_pandas = pd.read_excel(file, engine='openpyxl')
-                logger.info("Excel file read successfully with openpyxl engine")
-            except Exception as e1:
+        if file_format in TEXT_FORMATS:
+            # Sample the leading bytes once; every sniffing step reuses this buffer
+            sample = file.read(SNIFF_BYTES)
+            file.seek(0)
+
+        if file_format == 'xlsx':
+            # Read straight into Polars, preferring the calamine engine
+            if CALAMINE_AVAILABLE:
                 try:
-                    # Reset and try with xlrd engine for older files
-                    file.seek(0)
-                    df_pandas = pd.read_excel(file, engine='xlrd')
-                    logger.info("Excel file read successfully with xlrd engine")
-                except Exception as e2:
-                    # Reset and try without specifying engine
+                    df = pl.read_excel(file, engine='calamine', infer_schema_length=EXCEL_INFER_SCHEMA_LENGTH)
+                    logger.info("Excel file read successfully with calamine engine")
+                    return df
+                except Exception as e:
+                    logger.warning(f"calamine engine failed, falling back to openpyxl: {str(e)}")
                     file.seek(0)
-                    df_pandas = pd.read_excel(file)
-                    logger.info("Excel file read successfully with default engine")
+
+            # Fall back to openpyxl engine
+            df = pl.read_excel(
+                file,
+                engine='openpyxl',
+                engine_options=OPENPYXL_READ_OPTIONS,
+                infer_schema_length=EXCEL_INFER_SCHEMA_LENGTH
+            )
+            logger.info("Excel file read successfully with openpyxl engine")
+            return df
+
+        elif file_format == 'xls':
+            # Legacy .xls workbooks can only be read by xlrd; pandas is only imported for them
+            import pandas as pd
+            df_pandas = pd.read_excel(file, engine='xlrd')
+            logger.info("Excel file read successfully with xlrd engine")
 
             # Convert to Polars
             return pl.from_pandas(df_pandas)
 
         elif file_format == 'csv':
-            # Try multiple encoding approaches for CSV
-            encodings = ['utf-8', 'utf-8-lossy', 'latin-1', 'cp1252']
-            for encoding in encodings:
-                try:
-                    file.seek(0)
-                    df = pl.read_csv(file, encoding=encoding, ignore_errors=True)
-                    logger.info(f"CSV file read successfully with {encoding} encoding")
-                    return df
-                except Exception:
-                    continue
-
-            # If all encodings fail, try with pandas then convert
-            file.seek(0)
-            df_pandas = pd.read_csv(file, encoding='utf-8', errors='replace')
-            return pl.from_pandas(df_pandas)
+            # Sniff the encoding once, then parse in a single pass
+            encoding = detect_encoding(sample)
+            df = pl.read_csv(path or file, encoding=encoding, ignore_errors=True)
+            logger.info(f"CSV file read successfully with {encoding} encoding")
+            return df
 
         elif file_format == 'tsv':
-            # Try multiple encoding approaches for TSV
-            encodings = ['utf-8', 'utf-8-lossy', 'latin-1', 'cp1252']
-            for encoding in encodings:
-                try:
-                    file.seek(0)
-                    df = pl.read_csv(file, separator='\t', encoding=encoding, ignore_errors=True)
-                    logger.info(f"TSV file read successfully with {encoding} encoding")
-                    return df
-                except Exception:
-                    continue
-
-            # If all encodings fail, try with pandas then convert
-            file.seek(0)
-            df_pandas = pd.read_csv(file, sep='\t', encoding='utf-8', errors='replace')
-            return pl.from_pandas(df_pandas)
+            # Sniff the encoding once, then parse in a single pass
+            encoding = detect_encoding(sample)
+            df = pl.read_csv(path or file, separator='\t', encoding=encoding, ignore_errors=True)
+            logger.info(f"TSV file read successfully with {encoding} encoding")
+            return df
 
         elif file_format == 'txt':
-            # Try different separators and encodings for text files
-            separators = [',', '\t', ';', '|']
-            encodings = ['utf-8', 'utf-8-lossy', 'latin-1', 'cp1252']
-
-            for sep in separators:
-                for encoding in encodings:
-                    try:
-                        file.seek(0)
-                        df = pl.read_csv(file, separator=sep, encoding=encoding, ignore_errors=True)
-                        if len(df.columns) > 1:  # Valid separator found
-                            logger.info(f"TXT file read successfully with '{sep}' separator and {encoding} encoding")
-                            return df
-                    except Exception:
-                        continue
-
-            # If all combinations fail, try with pandas
-            file.seek(0)
-            content = file.read().decode('utf-8', errors='replace')
-            for sep in separators:
-                try:
-                    df_pandas = pd.read_csv(StringIO(content), sep=sep)
-                    if len(df_pandas.columns) > 1:
-                        logger.info(f"TXT file read successfully with pandas using '{sep}' separator")
-                        return pl.from_pandas(df_pandas)
-                except Exception:
-                    continue
-
-            raise ValueError("Could not determine separator for TXT file")
+            # Sniff separator and encoding from the same sample, then parse once
+            sep = detect_separator(sample)
+            if sep is None:
+                raise ValueError("Could not determine separator for TXT file")
+            encoding = detect_encoding(sample)
+            df = pl.read_csv(path or file, separator=sep, encoding=encoding, ignore_errors=True)
+            logger.info(f"TXT file read successfully with '{sep}' separator and {encoding} encoding")
+            return df
 
         else:
             raise ValueError(f"Unsupported file format: {file_format}")
@@ -318,6 +447,65 @@ def read_file_with_polars(file, file_format):
         logger.error(f"Error reading {file_format} file: {str(e)}")
         raise ValueError(f"Could not read {file_format.upper()} file: {str(e)}")
 
+def file_digest(file):
+    """Return a short content hash of an uploaded file, used as a cache key."""
+    return hashlib.blake2b(file.getvalue(), digest_size=16).hexdigest()
+
+# Bounded like the export caches; four entries hold the POS and Supplier files of two merges
+@st.cache_data(max_entries=4, ttl=600, show_spinner=False)
+def read_uploaded_file(data, file_name):
+    """
+    Read the raw bytes of an uploaded file into a Polars DataFrame.
+    Cached on the file contents, so reruns and re-uploads of an identical
+    file skip parsing entirely.
+
+    Args:
+        data: Raw file bytes
+        file_name: Original file name, used for format detection
+
+    Returns:
+        polars.DataFrame: Loaded data
+    """
+    file = BytesIO(data)
+    file.name = file_name
+    file_format = detect_file_format(file)
+
+    if file_format not in TEXT_FORMATS:
+        return read_file_with_polars(file, file_format)
+
+    # Spill delimited text to disk for Polars' memory-mapped, multi-threaded CSV reader
+    with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file_name)[1]) as tmp:
+        tmp.write(data)
+    try:
+        return read_file_with_polars(file, file_format, path=tmp.name)
+    finally:
+        os.unlink(tmp.name)
+
+def upc_fits_uint64(upc):
+    """
+    Check whether a UPC column can be cast to UInt64 without changing any value.
+
+    Args:
+        upc: UPC column as a Polars Series
+
+    Returns:
+        bool: True for non-negative integers, or floats holding only non-negative whole numbers
+    """
+    if upc.dtype.is_unsigned_integer():
+        return True
+    values = upc.drop_nulls()
+    if upc.dtype.is_signed_integer():
+        return values.is_empty() or values.min() >= 0
+    if upc.dtype.is_float():
+        # Casting would silently truncate fractions and wrap out-of-range values
+        return bool(
+            values.is_finite().all()
+            and (values >= 0).all()
+            and (values < 2**64).all()
+            and (values == values.floor()).all()
+        )
+    return False
+
 def perform_simple_merge(pos_df, supplier_df):
     """
     Perform simple merge: Find all UPCs from POS sheet and match them in Supplier sheet.
@@ -343,30 +531,53 @@ def perform_simple_merge(pos_df, supplier_df):
         if "UPC" not in supplier_df.columns:
             raise ValueError("UPC column not found in Supplier data")
 
-        # Convert UPC columns to string type for accurate matching
-        # Handle potential null values
-        pos_df = pos_df.with_columns(
-            pl.col("UPC").cast(pl.Utf8).fill_null("MISSING_UPC")
-        )
-        supplier_df = supplier_df.with_columns(
-            pl.col("UPC").cast(pl.Utf8).fill_null("MISSING_UPC")
-        )
-
         logger.info("Performing simple merge: Finding POS UPCs in Supplier data")
         logger.info(f"POS data: {pos_df.shape[0]} rows, Supplier data: {supplier_df.shape[0]} rows")
 
-        # Perform inner join - only keep records where UPC exists in both files
-        merged_df = pos_df.join(supplier_df, on="UPC", how="inner")
-
-        # Calculate unmatched records
-        if not merged_df.is_empty():
-            merged_upcs = set(merged_df["UPC"].to_list())
-            unmatched_pos = pos_df.filter(~pl.col("UPC").is_in(merged_upcs))
-            unmatched_supplier = supplier_df.filter(~pl.col("UPC").is_in(merged_upcs))
+        # Build all three outputs as one lazy plan so Polars can share the
+        # UPC preparation and run the joins in parallel
+        pos_lf = pos_df.lazy()
+        supplier_lf = supplier_df.lazy()
+
+        # Join on a temporary integer key when both UPC columns hold non-negative whole
+        # numbers (cheaper to hash than strings); otherwise join on the string UPC itself
+        if upc_fits_uint64(pos_df["UPC"]) and upc_fits_uint64(supplier_df["UPC"]):
+            join_key = "__upc_key"
+            upc_key = pl.col("UPC").cast(pl.UInt64).alias(join_key)
+            pos_lf = pos_lf.with_columns(upc_key)
+            supplier_lf = supplier_lf.with_columns(upc_key)
         else:
-            # No matches found
-            unmatched_pos = pos_df
-            unmatched_supplier = supplier_df
+            join_key = "UPC"
+
+        # UPC is always output as text, whichever key is used for matching
+        if pos_df.schema["UPC"] != pl.Utf8:
+            pos_lf = pos_lf.with_columns(pl.col("UPC").cast(pl.Utf8))
+        if supplier_df.schema["UPC"] != pl.Utf8:
+            supplier_lf = supplier_lf.with_columns(pl.col("UPC").cast(pl.Utf8))
+
+        # Inner join - only keep records where UPC exists in both files
+        # (null UPCs never match, so they end up in the unmatched outputs).
+        # With the integer key, the matching supplier UPC duplicates the POS one
+        supplier_join_lf = supplier_lf.drop("UPC") if join_key != "UPC" else supplier_lf
+        merged_lf = pos_lf.join(supplier_join_lf, on=join_key, how="inner")
+
+        # Unmatched records via anti-joins on the same key
+        unmatched_pos_lf = pos_lf.join(supplier_lf.select(join_key), on=join_key, how="anti")
+        unmatched_supplier_lf = supplier_lf.join(pos_lf.select(join_key), on=join_key, how="anti")
+
+        if join_key != "UPC":
+            merged_lf = merged_lf.drop(join_key)
+            unmatched_pos_lf = unmatched_pos_lf.drop(join_key)
+            unmatched_supplier_lf = unmatched_supplier_lf.drop(join_key)
+
+        # Label null UPCs in the unmatched outputs
+        missing_upc = pl.col("UPC").fill_null("MISSING_UPC")
+        unmatched_pos_lf = unmatched_pos_lf.with_columns(missing_upc)
+        unmatched_supplier_lf = unmatched_supplier_lf.with_columns(missing_upc)
+
+        merged_df, unmatched_pos, unmatched_supplier = pl.collect_all(
+            [merged_lf, unmatched_pos_lf, unmatched_supplier_lf]
+        )
 
         logger.info(f"Merge completed: {merged_df.shape[0]} rows, {merged_df.shape[1]} columns")
         logger.info(f"Unmatched POS: {unmatched_pos.shape[0]} rows, Unmatched Supplier: {unmatched_supplier.shape[0]} rows")
@@ -377,64 +588,329 @@ def perform_simple_merge(pos_df, supplier_df):
         logger.error(f"Error during merge: {str(e)}")
         raise ValueError(f"Merge failed: {str(e)}")
 
-def create_excel_with_sheets(merged_df, unmatched_pos, unmatched_supplier):
+@st.cache_data(max_entries=3, ttl=600, show_spinner=False)
+def cached_merge(pos_digest, supplier_digest, _pos_df, _supplier_df):
     """
-    Create Excel file with three sheets using openpyxl.
-    Enhanced error handling and data validation.
+    Cached wrapper around perform_simple_merge.
+    Keyed on the content hashes of the two uploaded files; the DataFrames
+    themselves are excluded from hashing (leading underscore).
 
     Returns:
-        BytesIO: Excel file in memory
+        tuple: (merged_df, unmatched_pos, unmatched_supplier)
     """
-    try:
-        output = BytesIO()
+    return perform_simple_merge(_pos_df, _supplier_df)
 
-        # Convert Polars DataFrames to Pandas for Excel export
-        # Handle empty DataFrames gracefully
-        try:
-            merged_pandas = merged_df.to_pandas() if not merged_df.is_empty() else pd.DataFrame()
-        except Exception:
-            merged_pandas = pd.DataFrame()
+def request_filter_removal(index):
+    """Delete-button callback: remember which pending filter to remove on the rerun."""
+    st.session_state['_delete_filter'] = index
 
-        try:
-            unmatched_pos_pandas = unmatched_pos.to_pandas() if not unmatched_pos.is_empty() else pd.DataFrame()
-        except Exception:
-            unmatched_pos_pandas = pd.DataFrame()
+@st.cache_resource
+def get_export_executor():
+    """Return the shared thread pool used to build exports off the script thread."""
+    return ThreadPoolExecutor(max_workers=len(EXPORT_FORMATS))
 
+@st.cache_data(max_entries=8, ttl=EXPORT_URL_REUSE_SECONDS, show_spinner=False)
+def upload_export(fingerprint, file_name, _data):
+    """
+    Upload an export to EXPORT_S3_BUCKET and return a presigned download URL.
+    Cached on the data fingerprint and file name, so regenerating an unchanged
+    export reuses the uploaded object instead of uploading it again.
+
+    Args:
+        fingerprint: Fingerprint of the exported data
+        file_name: Download file name, kept as the last part of the object key
+        _data: Encoded export bytes (not hashed)
+
+    Returns:
+        str: Presigned URL valid for EXPORT_URL_EXPIRY_SECONDS
+    """
+    # boto3 is optional and only needed when an export bucket is configured
+    import boto3
+
+    s3 = boto3.client('s3')
+    key = f"exports/{uuid.uuid4()}/{file_name}"
+    s3.upload_fileobj(BytesIO(_data), EXPORT_S3_BUCKET, key)
+    return s3.generate_presigned_url(
+        'get_object',
+        Params={'Bucket': EXPORT_S3_BUCKET, 'Key': key},
+        ExpiresIn=EXPORT_URL_EXPIRY_SECONDS
+    )
+
+def run_export(encode, export_format, file_name, rows, fingerprint):
+    """
+    Encode one export on a worker thread, uploading large files to S3 when configured.
+
+    Args:
+        encode: Callable returning the encoded export bytes
+        export_format: Export option being generated
+        file_name: Download file name of the export
+        rows: Number of rows in the exported frame
+        fingerprint: Fingerprint of the exported data, used to reuse uploads
+
+    Returns:
+        bytes | str: Export contents, or a presigned download URL for uploaded exports
+    """
+    data = encode()
+
+    # One structured log line per finished export
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(
+            "export_generated format=%s rows=%d bytes=%d", export_format, rows, len(data),
+            extra={"format": export_format, "rows": rows, "bytes": len(data)}
+        )
+
+    if EXPORT_S3_BUCKET and len(data) > EXPORT_S3_THRESHOLD_BYTES:
         try:
-            unmatched_supplier_pandas = unmatched_supplier.to_pandas() if not unmatched_supplier.is_empty() else pd.DataFrame()
-        except Exception:
-            unmatched_supplier_pandas = pd.DataFrame()
-
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            # Write merged data
-            if not merged_pandas.empty:
-                merged_pandas.to_excel(writer, sheet_name='Merged Data', index=False)
-            else:
-                empty_df = pd.DataFrame({'Message': ['No merged data available']})
-                empty_df.to_excel(writer, sheet_name='Merged Data', index=False)
+            return upload_export(fingerprint, file_name, data)
+        except Exception as e:
+            # Missing boto3 or credentials: fall back to the in-app download
+            logger.warning(f"Export upload to S3 failed, serving it directly: {str(e)}")
+    return data
 
-            # Write unmatched POS data
-            if not unmatched_pos_pandas.empty:
-                unmatched_pos_pandas.to_excel(writer, sheet_name='Unmatched from POS', index=False)
-            else:
-                empty_df = pd.DataFrame({'Message': ['No unmatched POS records']})
-                empty_df.to_excel(writer, sheet_name='Unmatched from POS', index=False)
+def create_excel_with_sheets(merged_df, unmatched_pos, unmatched_supplier):
+    """
+    Create Excel file with three sheets using xlsxwriter.
+    Rows are streamed straight from the Polars DataFrames in constant-memory mode,
+    so only the current row is held in memory while writing.
 
-            # Write unmatched Supplier data
-            if not unmatched_supplier_pandas.empty:
-                unmatched_supplier_pandas.to_excel(writer, sheet_name='Unmatched from Supplier', index=False)
-            else:
-                empty_df = pd.DataFrame({'Message': ['No unmatched Supplier records']})
-                empty_df.to_excel(writer, sheet_name='Unmatched from Supplier', index=False)
+    Returns:
+        BytesIO: Excel file in memory
+    """
+    # Imported on first Excel export so app startup does not pay for it
+    import xlsxwriter
+
+    try:
+        output = BytesIO()
+
+        # xlsxwriter silently drops rows past the sheet limit, so fail loudly instead
+        for name, df in [('Merged', merged_df), ('Unmatched POS', unmatched_pos), ('Unmatched Supplier', unmatched_supplier)]:
+            if df.height + 1 > EXCEL_MAX_ROWS:
+                raise ValueError(f"{name} data has {df.height:,} rows, more than an Excel sheet can hold")
+
+        sheets = [
+            ('Merged Data', merged_df, 'No merged data available'),
+            ('Unmatched from POS', unmatched_pos, 'No unmatched POS records'),
+            ('Unmatched from Supplier', unmatched_supplier, 'No unmatched Supplier records'),
+        ]
+
+        workbook_options = {
+            'constant_memory': True,
+            'default_date_format': EXCEL_TEMPORAL_FORMATS[pl.Datetime],
+            'nan_inf_to_errors': True,
+            # Write text cells verbatim instead of scanning each one for URLs/formulas
+            'strings_to_urls': False,
+            'strings_to_formulas': False,
+            'strings_to_numbers': False,
+        }
+        with xlsxwriter.Workbook(output, workbook_options) as workbook:
+            temporal_formats = {
+                dtype: workbook.add_format({'num_format': num_format})
+                for dtype, num_format in EXCEL_TEMPORAL_FORMATS.items()
+            }
+
+            for sheet_name, df, empty_message in sheets:
+                worksheet = workbook.add_worksheet(sheet_name)
+
+                # Handle empty DataFrames gracefully
+                if df.is_empty():
+                    worksheet.write_row(0, 0, ['Message'])
+                    worksheet.write_row(1, 0, [empty_message])
+                    continue
+
+                # Date, Datetime and Time columns each get their own number format
+                temporal_columns = [
+                    (col_idx, temporal_formats[dtype.base_type()])
+                    for col_idx, dtype in enumerate(df.dtypes)
+                    if dtype.base_type() in temporal_formats
+                ]
+
+                worksheet.write_row(0, 0, df.columns)
+                for row_idx, row in enumerate(df.iter_rows(), start=1):
+                    worksheet.write_row(row_idx, 0, row)
+                    # The current row is still buffered in constant-memory mode, so
+                    # temporal cells can be rewritten with their column format
+                    for col_idx, cell_format in temporal_columns:
+                        if row[col_idx] is not None:
+                            worksheet.write_datetime(row_idx, col_idx, row[col_idx], cell_format)
 
         output.seek(0)
-        logger.info("Excel file with multiple sheets created successfully")
         return output
 
     except Exception as e:
         logger.error(f"Error creating Excel file: {str(e)}")
         raise ValueError(f"Failed to create Excel file: {str(e)}")
 
+def frame_fingerprint(df):
+    """
+    Cheap content fingerprint of a DataFrame, used as an export cache key.
+    Combines the shape and schema with Polars' vectorised row hashes.
+    """
+    return df.shape, tuple(df.columns), tuple(str(dtype) for dtype in df.dtypes), int(df.hash_rows().sum())
+
+@st.cache_data(max_entries=3, ttl=600, show_spinner=False)
+def export_parquet(fingerprint, _df):
+    """
+    Serialize a DataFrame to Parquet bytes, cached on its fingerprint.
+
+    Returns:
+        bytes: Parquet file contents
+    """
+    parquet_buffer = BytesIO()
+    _df.write_parquet(
+        parquet_buffer,
+        compression='zstd',
+        compression_level=3,
+        statistics=True,
+        row_group_size=PARQUET_ROW_GROUP_SIZE,
+        data_page_size=PARQUET_DATA_PAGE_SIZE,
+        use_pyarrow=False  # Polars' native writer already encodes columns in parallel
+    )
+    return parquet_buffer.getvalue()
+
+@st.cache_data(max_entries=3, ttl=600, show_spinner=False)
+def export_json(fingerprint, _df, ndjson=False):
+    """
+    Serialize a DataFrame to compact JSON bytes, cached on its fingerprint.
+    Writes a records array, or newline-delimited JSON (one record per line,
+    streamable by downstream tools) when ndjson is set.
+
+    Returns:
+        bytes: JSON file contents
+    """
+    json_buffer = BytesIO()
+    if ndjson:
+        _df.write_ndjson(json_buffer)
+    else:
+        _df.write_json(json_buffer)
+    return json_buffer.getvalue()
+
+@st.cache_data(max_entries=3, ttl=600, show_spinner=False)
+def export_excel(fingerprints, _merged_df, _unmatched_pos, _unmatched_supplier):
+    """
+    Build the three-sheet Excel export, cached on the fingerprints of all three DataFrames.
+
+    Returns:
+        bytes: Excel file contents
+    """
+    return create_excel_with_sheets(_merged_df, _unmatched_pos, _unmatched_supplier).getvalue()
+
+@st.fragment
+def export_section():
+    """
+    Step 3: Multi-format export.
+    Runs as a fragment, so export interactions and status checks rerun only
+    this section; the encoding itself happens on the shared export thread pool.
+    """
+    st.markdown('<div class="step-indicator">📤 Step 3: Multi-Format Export</div>', unsafe_allow_html=True)
+
+    # Export format selection
+    export_formats = st.multiselect(
+        "Choose export formats:",
+        options=list(EXPORT_FORMATS),
+        default=['Parquet (.parquet)'],
+        help="Parquet is the fastest and most compact export; Excel also includes the unmatched records. "
+             "Selected formats are generated in parallel."
+    )
+
+    row_count = st.session_state['working_shape'][0]
+    if 'Excel (.xlsx)' in export_formats and row_count + 1 > EXCEL_MAX_ROWS:
+        st.warning(f"⚠️ Excel sheets hold at most {EXCEL_MAX_ROWS:,} rows but your data has {row_count:,}. Use Parquet for data this large.")
+
+    # Generate export files
+    if st.button("📥 Generate Export File", type="primary", use_container_width=True, disabled=not export_formats):
+        with st.spinner("Generating export file..."):
+            try:
+                # Materialise the transformation pipeline only when exporting
+                working_df = st.session_state['working_lf'].collect()
+
+                unmatched_pos = st.session_state['unmatched_pos']
+                unmatched_supplier = st.session_state['unmatched_supplier']
+
+                # Refuse exports whose estimated output would exhaust the worker's memory,
+                # before any copy is made; Excel also writes both unmatched sheets
+                working_size = working_df.estimated_size()
+                export_sizes = {fmt: working_size for fmt in export_formats}
+                if 'Excel (.xlsx)' in export_sizes:
+                    export_sizes['Excel (.xlsx)'] += unmatched_pos.estimated_size() + unmatched_supplier.estimated_size()
+                for fmt, export_size in export_sizes.items():
+                    if export_size * EXPORT_SIZE_MULTIPLIERS[fmt] > EXPORT_MAX_BYTES:
+                        st.error(
+                            f"❌ {fmt} export would exceed {EXPORT_MAX_BYTES / 1024**3:.1f} GiB. "
+                            "Apply filters or remove columns to reduce the data size."
+                        )
+                        logger.warning(f"Export refused ({fmt}): estimated {export_size} bytes in memory")
+                        st.stop()
+
+                # One contiguous chunk per column so every writer works on a single buffer
+                if working_df.n_chunks() > 1:
+                    working_df = working_df.rechunk()
+
+                # Very large frames are exported as newline-delimited JSON
+                use_ndjson = working_size > NDJSON_THRESHOLD_BYTES
+
+                # Hash each frame once; the fingerprints key both the encoder and the upload caches
+                working_fingerprint = frame_fingerprint(working_df)
+                fingerprints = {fmt: working_fingerprint for fmt in export_formats}
+                if 'Excel (.xlsx)' in fingerprints:
+                    fingerprints['Excel (.xlsx)'] = (
+                        working_fingerprint,
+                        frame_fingerprint(unmatched_pos),
+                        frame_fingerprint(unmatched_supplier)
+                    )
+                encoders = {
+                    'Parquet (.parquet)': lambda: export_parquet(working_fingerprint, working_df),
+                    'JSON (.json)': lambda: export_json(working_fingerprint, working_df, ndjson=use_ndjson),
+                    'Excel (.xlsx)': lambda: export_excel(
+                        fingerprints['Excel (.xlsx)'], working_df, unmatched_pos, unmatched_supplier
+                    ),
+                }
+
+                # Encode each selected format on its own thread; Polars' writers release the GIL
+                executor = get_export_executor()
+                export_futures = {}
+                for fmt in export_formats:
+                    download_info = NDJSON_EXPORT if fmt == 'JSON (.json)' and use_ndjson else EXPORT_FORMATS[fmt]
+                    export_future = executor.submit(
+                        run_export, encoders[fmt], fmt, download_info[1], working_df.height, fingerprints[fmt]
+                    )
+                    export_futures[fmt] = (export_future, *download_info)
+                st.session_state['export_futures'] = export_futures
+
+                # Give quick exports a moment so they can be offered in this run
+                wait([export[0] for export in export_futures.values()], timeout=EXPORT_WAIT_SECONDS)
+
+            except Exception as e:
+                st.error(f"❌ Export failed: {str(e)}")
+                logger.error(f"Export failed: {str(e)}")
+
+    # Export status, polled on each rerun while files are generated in the background
+    export_futures = st.session_state.get('export_futures', {})
+    for fmt, (export_future, label, file_name, mime) in list(export_futures.items()):
+        if not export_future.done():
+            st.info(f"⏳ {fmt} file is being generated in the background...")
+        elif export_future.exception() is not None:
+            st.error(f"❌ {fmt} export failed: {str(export_future.exception())}")
+            logger.error(f"Export failed ({fmt}): {str(export_future.exception())}")
+            del export_futures[fmt]
+        elif isinstance(export_future.result(), str):
+            # Large exports were uploaded to S3; link to them instead of sending the bytes to the browser
+            st.markdown(f"[{label}]({export_future.result()})")
+            st.caption(f"Download link expires within {EXPORT_URL_EXPIRY_SECONDS // 60} minutes")
+        else:
+            st.download_button(
+                label=label,
+                data=export_future.result(),
+                file_name=file_name,
+                mime=mime,
+                key=f"download_{fmt}",
+                use_container_width=True
+            )
+
+    if any(not export[0].done() for export in export_futures.values()):
+        st.button("🔄 Check Export Status")
+    elif export_futures:
+        st.success("✅ Export file generated successfully!")
+
 def main():
     """Main application function."""
     # Page config is already set at module level
@@ -521,12 +997,10 @@ def main():
                         try:
                             # Read files with enhanced error handling
                             st.info("📖 Reading POS file...")
-                            pos_format = detect_file_format(pos_file)
-                            pos_df = read_file_with_polars(pos_file, pos_format)
+                            pos_df = read_uploaded_file(pos_file.getvalue(), pos_file.name)
 
                             st.info("📖 Reading Supplier file...")
-                            supplier_format = detect_file_format(supplier_file)
-                            supplier_df = read_file_with_polars(supplier_file, supplier_format)
+                            supplier_df = read_uploaded_file(supplier_file.getvalue(), supplier_file.name)
 
                             # Validate data
                             if pos_df.is_empty():
@@ -550,8 +1024,13 @@ def main():
 
                             st.info("🔄 Performing merge: Finding POS UPCs in Supplier data...")
 
-                            # Perform simple merge
-                            merged_df, unmatched_pos, unmatched_supplier = perform_simple_merge(pos_df, supplier_df)
+                            # Perform simple merge, cached on the uploads' content hashes
+                            # (hashed only here, not on every rerun)
+                            pos_digest = file_digest(pos_file)
+                            supplier_digest = file_digest(supplier_file)
+                            merged_df, unmatched_pos, unmatched_supplier = cached_merge(
+                                pos_digest, supplier_digest, pos_df, supplier_df
+                            )
 
                             # Validate merge results
                             if merged_df.is_empty():
@@ -563,6 +1042,7 @@ def main():
                             st.session_state['unmatched_supplier'] = unmatched_supplier
                             st.session_state['original_columns'] = merged_df.columns
                             st.session_state['merge_success'] = True
+                            st.session_state.pop('working_key', None)  # Rebuild Step 2 data
 
                             # Display results
                             st.success("✅ Merge completed successfully!")
@@ -576,7 +1056,7 @@ def main():
                             # Provide helpful suggestions based on error type
                             if "UPC" in error_msg:
                                 st.info("💡 **Tip**: Make sure both files have a column named exactly 'UPC' (case-sensitive)")
-                            elif "Excel" in error_msg or "xlsx" in error_msg:
+                            elif "excel" in error_msg.lower() or "xls" in error_msg.lower():
                                 st.info("💡 **Tip**: Try saving your Excel file as CSV format if the issue persists")
                             elif "encoding" in error_msg.lower():
                                 st.info("💡 **Tip**: Try saving your file with UTF-8 encoding")
@@ -606,9 +1086,6 @@ def main():
             )
 
             if selected_columns:
-                # Apply column selection
-                working_df = merged_df.select(selected_columns)
-
                 # Column renaming
                 st.subheader("✏️ Column Renaming")
                 rename_columns = {}
@@ -628,29 +1105,38 @@ def main():
                         if new_name != col:
                             rename_columns[col] = new_name
 
-                # Apply renaming
-                if rename_columns:
-                    working_df = working_df.rename(rename_columns)
-                    logger.info(f"Columns renamed: {rename_columns}")
-
                 # Data filtering
                 st.subheader("🔍 Data Filtering")
 
-                # Initialize filters in session state
+                # Filters are edited in 'pending_filters' and only copied to the
+                # applied 'filters' when the user clicks "Apply Filters"
+                if 'pending_filters' not in st.session_state:
+                    st.session_state['pending_filters'] = []
                 if 'filters' not in st.session_state:
                     st.session_state['filters'] = []
 
                 # Add filter button
                 if st.button("➕ Add Filter"):
-                    st.session_state['filters'].append({
+                    st.session_state['pending_filters'].append({
                         'column': selected_columns[0] if selected_columns else '',
                         'operator': 'equals',
                         'value': ''
                     })
 
+                # Remove a filter whose delete button was clicked, in a single pass
+                if '_delete_filter' in st.session_state:
+                    delete_index = st.session_state.pop('_delete_filter')
+                    pending_filters = st.session_state['pending_filters']
+                    st.session_state['pending_filters'] = [
+                        f for j, f in enumerate(pending_filters) if j != delete_index
+                    ]
+                    # Widget state is keyed by position, so reset the rows that shifted up
+                    for j in range(delete_index, len(pending_filters)):
+                        for key in (f"filter_col_{j}", f"filter_op_{j}", f"filter_val_{j}"):
+                            st.session_state.pop(key, None)
+
                 # Display and manage filters
-                filters_to_remove = []
-                for i, filter_config in enumerate(st.session_state['filters']):
+                for i, filter_config in enumerate(st.session_state['pending_filters']):
                     col1, col2, col3, col4 = st.columns([3, 2, 3, 1])
 
                     with col1:
@@ -664,7 +1150,8 @@ def main():
                     with col2:
                         filter_config['operator'] = st.selectbox(
                             "Operator",
-                            options=['equals', 'not equals', 'contains', 'greater than', 'less than'],
+                            options=FILTER_OPERATORS,
+                            index=FILTER_OPERATORS.index(filter_config['operator']),
                             key=f"filter_op_{i}"
                         )
 
@@ -676,112 +1163,102 @@ def main():
                         )
 
                     with col4:
-                        if st.button("🗑️", key=f"remove_filter_{i}"):
-                            filters_to_remove.append(i)
+                        st.button("🗑️", key=f"remove_filter_{i}", on_click=request_filter_removal, args=(i,))
+
+                # Apply filters button
+                apply_filters = st.button("✅ Apply Filters")
+                if apply_filters:
+                    st.session_state['filters'] = [dict(f) for f in st.session_state['pending_filters']]
+                elif st.session_state['pending_filters'] != st.session_state['filters']:
+                    st.caption("Filter changes are pending. Click **Apply Filters** to update the data.")
+
+                # Rebuild the working data only when filters are applied or the
+                # column selection / renaming changes, not on every widget rerun
+                transform_key = (tuple(selected_columns), tuple(rename_columns.items()))
+                if (
+                    apply_filters
+                    or st.session_state.get('working_key') != transform_key
+                    or 'working_lf' not in st.session_state
+                ):
+                    # Build the pipeline lazily; only the preview and row count are collected here
+                    # Apply column selection
+                    working_lf = merged_df.lazy().select(selected_columns)
+
+                    # Apply renaming
+                    if rename_columns:
+                        working_lf = working_lf.rename(rename_columns)
+                        logger.info(f"Columns renamed: {rename_columns}")
+                    working_columns = [rename_columns.get(col, col) for col in selected_columns]
+
+                    # Apply filters as a single combined predicate (one pass over the data)
+                    filter_errors = []
+                    filter_exprs = []
+                    text_columns = {}  # Cast each filtered column to text only once
+                    for filter_config in st.session_state['filters']:
+                        if filter_config['value']:
+                            try:
+                                col_name = filter_config['column']
+                                operator = filter_config['operator']
+                                value = filter_config['value']
+
+                                if col_name not in working_columns:
+                                    raise ValueError(f"column '{col_name}' not found")
+                                text_col = text_columns.setdefault(col_name, pl.col(col_name).cast(pl.Utf8))
+
+                                if operator == 'equals':
+                                    filter_expr = text_col == value
+                                elif operator == 'not equals':
+                                    filter_expr = text_col != value
+                                elif operator == 'contains':
+                                    filter_expr = text_col.str.contains(value)
+                                elif operator == 'greater than':
+                                    filter_expr = pl.col(col_name) > float(value)
+                                elif operator == 'less than':
+                                    filter_expr = pl.col(col_name) < float(value)
+
+                                # Run the predicate on zero rows so an invalid filter (e.g. a numeric
+                                # comparison on text, a bad pattern) is dropped alone, not with the others
+                                working_lf.head(0).filter(filter_expr).collect()
+                                filter_exprs.append(filter_expr)
+                            except Exception as e:
+                                filter_errors.append(f"Filter error for {col_name}: {str(e)}")
+
+                    filtered_lf = working_lf.filter(pl.all_horizontal(filter_exprs)) if filter_exprs else working_lf
+                    try:
+                        preview_df, count_df = pl.collect_all([filtered_lf.head(10), filtered_lf.select(pl.len())])
+                        working_lf = filtered_lf
+                    except Exception as e:
+                        filter_errors.append(f"Filter error: {str(e)}")
+                        preview_df, count_df = pl.collect_all([working_lf.head(10), working_lf.select(pl.len())])
 
-                # Remove filters
-                for i in reversed(filters_to_remove):
-                    st.session_state['filters'].pop(i)
+                    # Store the lazy pipeline and its preview; the full frame is only collected for export.
+                    # The preview is converted to pandas once per rebuild, keeping Arrow-backed columns
+                    st.session_state['working_lf'] = working_lf
+                    st.session_state['working_preview'] = preview_df.to_pandas(use_pyarrow_extension_array=True)
+                    st.session_state['working_shape'] = (count_df.item(), len(working_columns))
+                    st.session_state['filter_errors'] = filter_errors
+                    st.session_state['working_key'] = transform_key
+                    st.session_state.pop('export_futures', None)  # Exports no longer match the data
 
-                # Apply filters
-                for filter_config in st.session_state['filters']:
-                    if filter_config['value']:
-                        try:
-                            col_name = filter_config['column']
-                            operator = filter_config['operator']
-                            value = filter_config['value']
-
-                            if operator == 'equals':
-                                working_df = working_df.filter(pl.col(col_name).cast(pl.Utf8) == value)
-                            elif operator == 'not equals':
-                                working_df = working_df.filter(pl.col(col_name).cast(pl.Utf8) != value)
-                            elif operator == 'contains':
-                                working_df = working_df.filter(pl.col(col_name).cast(pl.Utf8).str.contains(value))
-                            elif operator == 'greater than':
-                                working_df = working_df.filter(pl.col(col_name) > float(value))
-                            elif operator == 'less than':
-                                working_df = working_df.filter(pl.col(col_name) < float(value))
-                        except Exception as e:
-                            st.warning(f"Filter error for {col_name}: {str(e)}")
+                for filter_error in st.session_state.get('filter_errors', []):
+                    st.warning(filter_error)
 
                 # Display current data
-                st.dataframe(working_df.to_pandas().head(10), use_container_width=True)
-                st.info(f"📊 Current data: {working_df.shape[0]} rows, {working_df.shape[1]} columns")
-
-                # Store working dataframe
-                st.session_state['working_df'] = working_df
+                row_count, column_count = st.session_state['working_shape']
+                st.dataframe(st.session_state['working_preview'], use_container_width=True)
+                st.info(f"📊 Current data: {row_count} rows, {column_count} columns")
             else:
                 st.warning("Please select at least one column to continue.")
 
         # Step 3: Export
-        if 'working_df' in st.session_state:
-            st.markdown('<div class="step-indicator">📤 Step 3: Multi-Format Export</div>', unsafe_allow_html=True)
-
-            working_df = st.session_state['working_df']
-
-            # Export format selection
-            export_format = st.radio(
-                "Choose export format:",
-                options=['Excel (.xlsx)', 'JSON (.json)', 'Parquet (.parquet)'],
-                help="Select the format for your final export"
-            )
-
-            # Generate export file
-            if st.button("📥 Generate Export File", type="primary", use_container_width=True):
-                with st.spinner("Generating export file..."):
-                    try:
-                        if export_format == 'Excel (.xlsx)':
-                            # Create Excel with multiple sheets
-                            excel_file = create_excel_with_sheets(
-                                working_df,
-                                st.session_state['unmatched_pos'],
-                                st.session_state['unmatched_supplier']
-                            )
-
-                            st.download_button(
-                                label="📥 Download Excel File",
-                                data=excel_file.getvalue(),
-                                file_name="Data_Merger_V3_Export.xlsx",
-                                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                                use_container_width=True
-                            )
-                            logger.info("Excel export generated successfully")
-
-                        elif export_format == 'JSON (.json)':
-                            json_data = working_df.to_pandas().to_json(orient='records', indent=2)
-
-                            st.download_button(
-                                label="📥 Download JSON File",
-                                data=json_data,
-                                file_name="Data_Merger_V3_Export.json",
-                                mime="application/json",
-                                use_container_width=True
-                            )
-                            logger.info("JSON export generated successfully")
-
-                        elif export_format == 'Parquet (.parquet)':
-                            parquet_buffer = BytesIO()
-                            working_df.write_parquet(parquet_buffer)
-
-                            st.download_button(
-                                label="📥 Download Parquet File",
-                                data=parquet_buffer.getvalue(),
-                                file_name="Data_Merger_V3_Export.parquet",
-                                mime="application/octet-stream",
-                                use_container_width=True
-                            )
-                            logger.info("Parquet export generated successfully")
-
-                        st.success("✅ Export file generated successfully!")
-
-                    except Exception as e:
-                        st.error(f"❌ Export failed: {str(e)}")
-                        logger.error(f"Export failed: {str(e)}")
+        if 'working_lf' in st.session_state:
+            export_section()
 
 if __name__ == "__main__":
     try:
         main()
-    except Exception as e:
+    except (ImportError, OSError, RuntimeError) as e:
+        # Other errors propagate to Streamlit's own error display; tracebacks are only logged in debug mode
         st.error(f"Application failed to start: {str(e)}")
-        logger.error(f"Application startup error: {str(e)}")
+        logger.error(f"Application startup error: {str(e)}", exc_info=os.getenv('DEBUG') == '1')
         st.stop()